@@ -14,6 +14,13 @@ class Settings(BaseSettings):
     gladia_upload_url: str = "https://api.gladia.io/v2/upload"
     gladia_transcription_url: str = "https://api.gladia.io/v2/pre-recorded"
 
+    # Transcrição de áudios longos (segmentação por silêncio)
+    long_audio_threshold_seconds: int = 120
+    long_audio_segment_seconds: int = 60
+    long_audio_min_silence_ms: int = 500
+    long_audio_silence_thresh_db: int = -40
+    transcription_max_concurrency_per_user: int = 4
+
     # Qwen LLM
     qwen_api_key: str = Field(
         validation_alias=AliasChoices("QWEN_API_KEY", "DASHSCOPE_API_KEY")
@@ -27,6 +34,10 @@ class Settings(BaseSettings):
         validation_alias=AliasChoices("QWEN_MODEL", "QWEN_MODEL_NAME"),
     )
 
+    # Chat em lote (/chat/batch)
+    chat_batch_max_messages: int = 100
+    chat_batch_max_concurrency: int = 8
+
     # Server
     api_host: str = "0.0.0.0"
     api_port: int = 8000
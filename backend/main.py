@@ -1,6 +1,11 @@
 from fastapi import FastAPI, UploadFile, File, Form, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+import anyio
+import asyncio
+import httpx
+import json
 import logging
 from auth import verify_jwt, check_subscription, supabase
 from services.gladia_service import transcribe_audio
@@ -36,6 +41,10 @@ class ChatRequest(BaseModel):
     context_text: Optional[str] = None
 
 
+class BatchChatRequest(BaseModel):
+    messages: List[ChatRequest]
+
+
 @app.get("/")
 async def root():
     return {
@@ -89,7 +98,7 @@ async def process_audio(
 
         # ========== PASSO 3: TRANSCRIÇÃO COM GLADIA AI ==========
         logger.info("Iniciando transcrição com Gladia AI...")
-        transcription = await transcribe_audio(audio)
+        transcription = await transcribe_audio(audio, user_id=user_id)
         logger.info(f"Transcrição concluída: {transcription[:100]}...")
 
         # ========== PASSO 4: BUSCA DE CONTEXTO NO RAG ==========
@@ -197,6 +206,120 @@ async def chat_message(
         )
 
 
+@app.post("/chat/batch")
+async def chat_batch(
+    payload: BatchChatRequest,
+    user_data: dict = Depends(verify_jwt)
+):
+    """
+    Endpoint para processar várias mensagens de texto em uma única requisição.
+
+    - JWT e assinatura são verificados uma única vez para o lote
+    - Buscas no RAG são deduplicadas: mensagens iguais compartilham o mesmo contexto
+      (mensagens com context_text não consultam o RAG, pois ele tem prioridade)
+    - Respostas são geradas em paralelo, limitadas por CHAT_BATCH_MAX_CONCURRENCY,
+      reaproveitando as conexões com o Qwen em um client HTTP compartilhado
+    - O resultado é transmitido como NDJSON (uma linha JSON por mensagem, com "index"),
+      na ordem em que cada resposta fica pronta
+    """
+    user_id = user_data["user_id"]
+
+    if not payload.messages:
+        raise HTTPException(
+            status_code=400,
+            detail="O campo 'messages' não pode estar vazio."
+        )
+
+    if len(payload.messages) > settings.chat_batch_max_messages:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Máximo de {settings.chat_batch_max_messages} mensagens por lote."
+        )
+
+    logger.info(f"Processando lote de {len(payload.messages)} mensagens para user_id: {user_id}")
+
+    subscription = await check_subscription(user_id)
+    logger.info(f"Assinatura: {subscription['status']}")
+
+    max_concurrency = max(1, settings.chat_batch_max_concurrency)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    rag_tasks: Dict[str, asyncio.Task] = {}
+
+    def get_shared_rag_context(message_text: str) -> asyncio.Task:
+        if message_text not in rag_tasks:
+            rag_tasks[message_text] = asyncio.ensure_future(
+                get_rag_context(supabase, message_text)
+            )
+        return rag_tasks[message_text]
+
+    async def process_item(index: int, item: ChatRequest, qwen_client: httpx.AsyncClient) -> dict:
+        message_text = (item.message or "").strip()
+        if not message_text:
+            return {
+                "index": index,
+                "success": False,
+                "error": "O campo 'message' não pode estar vazio."
+            }
+
+        has_user_context = bool(item.context_text and item.context_text.strip())
+
+        try:
+            async with semaphore:
+                db_context = "" if has_user_context else await get_shared_rag_context(message_text)
+                response_text = await generate_response(
+                    transcription=message_text,
+                    context_text=item.context_text,
+                    db_context=db_context,
+                    client=qwen_client
+                )
+        except Exception as e:
+            logger.error(f"Erro no processamento da mensagem {index} do lote: {str(e)}")
+            return {
+                "index": index,
+                "success": False,
+                "error": f"Internal server error: {str(e)}"
+            }
+
+        return {
+            "index": index,
+            "success": True,
+            "response": response_text,
+            "context_used": "user_context" if has_user_context else (
+                "rag_context" if db_context else "no_context"
+            )
+        }
+
+    async def stream_results():
+        # Um único client para o lote: conexões com o Qwen são reaproveitadas
+        qwen_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=max_concurrency)
+        )
+        tasks = [
+            asyncio.ensure_future(process_item(index, item, qwen_client))
+            for index, item in enumerate(payload.messages)
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                result["user_id"] = user_id
+                result["subscription_status"] = subscription["status"]
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            # Cliente desconectou no meio do lote: não deixa tarefas órfãs.
+            # O Starlette cancela o stream via cancel scope do anyio, que cancelaria
+            # também estes awaits - por isso a limpeza roda em um escopo protegido.
+            with anyio.CancelScope(shield=True):
+                for task in tasks + list(rag_tasks.values()):
+                    task.cancel()
+                await asyncio.gather(*tasks, *rag_tasks.values(), return_exceptions=True)
+                await qwen_client.aclose()
+
+        logger.info("Lote de chat concluído")
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
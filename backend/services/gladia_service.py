@@ -1,13 +1,193 @@
+import asyncio
+import io
+import os
+import subprocess
+import tempfile
+import weakref
+from typing import List, Optional, Tuple
+
 import httpx
 from fastapi import UploadFile, HTTPException
 from config import get_settings
 import logging
 
+try:
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+    from pydub.utils import get_prober_name, mediainfo, which
+except ImportError:  # pragma: no cover - dependência opcional
+    AudioSegment = None
+    detect_silence = None
+    get_prober_name = None
+    mediainfo = None
+    which = None
+
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+if AudioSegment is None:
+    _SEGMENTATION_AVAILABLE = False
+    logger.warning(
+        "pydub não instalado: transcrição de áudios longos em segmentos desativada "
+        "(áudios longos serão enviados em um único job)."
+    )
+elif not (which(AudioSegment.converter) and which(get_prober_name())):
+    _SEGMENTATION_AVAILABLE = False
+    logger.warning(
+        "ffmpeg/ffprobe não encontrados no PATH: transcrição de áudios longos em "
+        "segmentos desativada (áudios longos serão enviados em um único job)."
+    )
+else:
+    _SEGMENTATION_AVAILABLE = True
+
+# Semáforos por usuário: limitam quantos segmentos de um mesmo usuário
+# são transcritos ao mesmo tempo na Gladia. Entradas somem sozinhas
+# quando nenhuma transcrição do usuário está em andamento.
+_user_semaphores: "weakref.WeakValueDictionary[str, asyncio.Semaphore]" = weakref.WeakValueDictionary()
+
+
+def _get_user_semaphore(user_id: Optional[str]) -> asyncio.Semaphore:
+    """
+    Retorna o semáforo de concorrência do usuário (ou um avulso sem user_id)
+    """
+    limit = max(1, settings.transcription_max_concurrency_per_user)
+    if not user_id:
+        return asyncio.Semaphore(limit)
+
+    semaphore = _user_semaphores.get(user_id)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(limit)
+        _user_semaphores[user_id] = semaphore
+    return semaphore
+
+
+def _compute_cut_points(
+    duration_ms: int,
+    silences: List[Tuple[int, int]],
+    target_ms: int
+) -> List[int]:
+    """
+    Escolhe os pontos de corte (em ms) no meio dos trechos de silêncio.
+
+    Cada segmento fecha no primeiro silêncio após atingir target_ms.
+    Se não houver silêncio até 2x target_ms, corta em target_ms para
+    que nenhum segmento fique longo demais. Um corte que deixaria menos de
+    target_ms / 2 no final é ignorado: a sobra fica no segmento anterior.
+    """
+    max_ms = target_ms * 2
+    min_tail_ms = target_ms // 2
+    cut_points: List[int] = []
+    start = 0
+
+    for silence_start, silence_end in silences:
+        middle = (silence_start + silence_end) // 2
+
+        while middle - start > max_ms:
+            start += target_ms
+            cut_points.append(start)
+
+        if duration_ms - middle < min_tail_ms:
+            break
+
+        if middle - start >= target_ms:
+            cut_points.append(middle)
+            start = middle
+
+    while duration_ms - start > max_ms:
+        start += target_ms
+        cut_points.append(start)
+
+    return cut_points
+
+
+def _probe_duration_seconds(path: str) -> Optional[float]:
+    """
+    Lê a duração do arquivo com ffprobe, sem decodificar o áudio
+    """
+    try:
+        return float(mediainfo(path)["duration"])
+    except Exception as e:
+        logger.warning(f"Não foi possível obter a duração do áudio: {e}")
+        return None
+
+
+def _decode_speech_audio(path: str) -> "AudioSegment":
+    """
+    Decodifica direto para WAV mono 16 kHz (suficiente para fala), evitando
+    manter em memória o PCM na taxa e nos canais originais. O WAV intermediário
+    é gravado no mesmo diretório temporário do arquivo de origem.
+    """
+    wav_path = os.path.join(os.path.dirname(path), "speech.wav")
+    subprocess.run(
+        [
+            AudioSegment.converter, "-y", "-v", "error",
+            "-i", path,
+            "-vn", "-ac", "1", "-ar", "16000",
+            "-f", "wav", wav_path
+        ],
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    return AudioSegment.from_wav(wav_path)
+
+
+def _split_long_audio(audio_content: bytes, filename: str) -> Optional[List[bytes]]:
+    """
+    Divide um áudio longo em segmentos WAV (mono, 16 kHz) nos silêncios.
+
+    A duração é lida com ffprobe antes de qualquer decodificação: áudios
+    curtos nem chegam a ser decodificados. Retorna None quando o áudio é
+    curto, quando pydub/ffmpeg não estão disponíveis ou quando o arquivo
+    não pôde ser lido - nesses casos a transcrição segue como um único job.
+    """
+    if not _SEGMENTATION_AVAILABLE:
+        return None
+
+    suffix = "." + filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+
+    # Arquivos comuns num diretório temporário (e não NamedTemporaryFile aberto):
+    # no Windows o ffprobe/ffmpeg não conseguem abrir um arquivo ainda aberto
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source" + suffix)
+        with open(source_path, "wb") as source_file:
+            source_file.write(audio_content)
+
+        duration = _probe_duration_seconds(source_path)
+        if duration is None or duration <= settings.long_audio_threshold_seconds:
+            return None
+
+        try:
+            audio = _decode_speech_audio(source_path)
+        except Exception as e:
+            logger.warning(f"Não foi possível decodificar o áudio para segmentação: {e}")
+            return None
+
+    silences = detect_silence(
+        audio,
+        min_silence_len=settings.long_audio_min_silence_ms,
+        silence_thresh=settings.long_audio_silence_thresh_db
+    )
+    cut_points = _compute_cut_points(
+        len(audio),
+        silences,
+        settings.long_audio_segment_seconds * 1000
+    )
+
+    segments: List[bytes] = []
+    bounds = [0] + cut_points + [len(audio)]
+    for start, end in zip(bounds, bounds[1:]):
+        buffer = io.BytesIO()
+        audio[start:end].export(buffer, format="wav")
+        segments.append(buffer.getvalue())
+
+    logger.info(
+        f"Áudio longo ({len(audio) / 1000:.0f}s) dividido em {len(segments)} segmentos"
+    )
+    return segments
+
 
-async def transcribe_audio(audio_file: UploadFile) -> str:
+async def transcribe_audio(audio_file: UploadFile, user_id: Optional[str] = None) -> str:
     """
     Transcribe audio using Gladia AI API v2
     Returns the transcribed text
@@ -17,6 +197,11 @@ async def transcribe_audio(audio_file: UploadFile) -> str:
     2. Get audio_url from upload response
     3. Start transcription job with /v2/pre-recorded
     4. Poll the result_url until transcription is complete
+
+    Long-audio mode: recordings longer than long_audio_threshold_seconds
+    are split at silence boundaries and the segments go through steps 1-4
+    concurrently (at most transcription_max_concurrency_per_user at a time
+    per user_id). Transcripts are joined back in the original order.
     """
     try:
         # Read audio file content
@@ -32,125 +217,178 @@ async def transcribe_audio(audio_file: UploadFile) -> str:
         filename = audio_file.filename or "audio.m4a"
         content_type = audio_file.content_type or "audio/m4a"
 
+        segments = await asyncio.to_thread(_split_long_audio, audio_content, filename)
+
         async with httpx.AsyncClient(timeout=120.0) as client:
-            # Step 1: Upload audio file
-            logger.info("Uploading audio file to Gladia...")
-            files = {
-                "audio": (filename, audio_content, content_type)
-            }
-            headers = {
-                "x-gladia-key": settings.gladia_api_key
-            }
-
-            upload_response = await client.post(
-                settings.gladia_upload_url,
-                files=files,
-                headers=headers
-            )
+            if not segments:
+                return await _transcribe_content(client, filename, audio_content, content_type)
 
-            try:
-                upload_response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                detail = exc.response.text
-                logger.error(
-                    "Gladia upload API respondeu com %s: %s",
-                    exc.response.status_code,
-                    detail,
-                )
-                raise HTTPException(
-                    status_code=exc.response.status_code,
-                    detail=f"Gladia upload error: {detail}"
-                ) from exc
-
-            upload_result = upload_response.json()
-            audio_url = upload_result.get("audio_url")
-
-            if not audio_url:
-                raise ValueError("No audio_url returned from upload")
-
-            logger.info(f"Audio uploaded successfully: {audio_url}")
-
-            # Step 2: Start transcription job
-            logger.info("Starting transcription job...")
-            transcription_payload = {
-                "audio_url": audio_url
-            }
-            transcription_headers = {
-                "x-gladia-key": settings.gladia_api_key,
-                "Content-Type": "application/json"
-            }
-
-            transcription_response = await client.post(
-                settings.gladia_transcription_url,
-                json=transcription_payload,
-                headers=transcription_headers
-            )
+            semaphore = _get_user_semaphore(user_id)
 
-            try:
-                transcription_response.raise_for_status()
-            except httpx.HTTPStatusError as exc:
-                detail = exc.response.text
-                logger.error(
-                    "Gladia transcription API respondeu com %s: %s",
-                    exc.response.status_code,
-                    detail,
-                )
-                raise HTTPException(
-                    status_code=exc.response.status_code,
-                    detail=f"Gladia transcription error: {detail}"
-                ) from exc
+            async def transcribe_segment(index: int, segment: bytes) -> str:
+                async with semaphore:
+                    logger.info(f"Transcrevendo segmento {index + 1}/{len(segments)}")
+                    return await _transcribe_content(
+                        client,
+                        f"segment_{index}.wav",
+                        segment,
+                        "audio/wav",
+                        allow_empty=True
+                    )
 
-            transcription_result = transcription_response.json()
-            result_url = transcription_result.get("result_url")
+            tasks = [
+                asyncio.ensure_future(transcribe_segment(i, segment))
+                for i, segment in enumerate(segments)
+            ]
+            try:
+                transcripts = await asyncio.gather(*tasks)
+            except BaseException:
+                # Um segmento falhou: cancela os demais antes de fechar o client,
+                # para nenhum deles sobreviver ocupando o semáforo do usuário
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
 
-            if not result_url:
-                raise ValueError("No result_url returned from transcription job")
+        transcription = " ".join(text.strip() for text in transcripts if text and text.strip())
+        if not transcription:
+            raise ValueError("Transcription completed but no text found")
 
-            logger.info(f"Transcription job started, polling results from: {result_url}")
+        logger.info("Transcription of all segments completed successfully")
+        return transcription
 
-            # Step 3: Poll for results
-            import asyncio
-            max_attempts = 60  # 60 attempts with 2 second intervals = 2 minutes max
-            attempt = 0
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Erro inesperado na transcrição")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Transcription error: {str(e)}"
+        ) from e
 
-            while attempt < max_attempts:
-                await asyncio.sleep(2)  # Wait 2 seconds between polls
 
-                result_response = await client.get(
-                    result_url,
-                    headers={"x-gladia-key": settings.gladia_api_key}
-                )
+async def _transcribe_content(
+    client: httpx.AsyncClient,
+    filename: str,
+    audio_content: bytes,
+    content_type: str,
+    allow_empty: bool = False
+) -> str:
+    """
+    Executa upload + job de transcrição + polling para um único arquivo
+    """
+    # Step 1: Upload audio file
+    logger.info("Uploading audio file to Gladia...")
+    files = {
+        "audio": (filename, audio_content, content_type)
+    }
+    headers = {
+        "x-gladia-key": settings.gladia_api_key
+    }
 
-                result_response.raise_for_status()
-                result_data = result_response.json()
+    upload_response = await client.post(
+        settings.gladia_upload_url,
+        files=files,
+        headers=headers
+    )
 
-                status = result_data.get("status")
-                logger.info(f"Transcription status: {status}")
+    try:
+        upload_response.raise_for_status()
+    except httpx.HTTPStatusError as exc:
+        detail = exc.response.text
+        logger.error(
+            "Gladia upload API respondeu com %s: %s",
+            exc.response.status_code,
+            detail,
+        )
+        raise HTTPException(
+            status_code=exc.response.status_code,
+            detail=f"Gladia upload error: {detail}"
+        ) from exc
 
-                if status == "done":
-                    # Extract transcription text
-                    transcription_obj = result_data.get("result", {}).get("transcription")
-                    if transcription_obj:
-                        transcription = transcription_obj.get("full_transcript", "")
-                        if transcription:
-                            logger.info("Transcription completed successfully")
-                            return transcription
+    upload_result = upload_response.json()
+    audio_url = upload_result.get("audio_url")
 
-                    raise ValueError("Transcription completed but no text found")
+    if not audio_url:
+        raise ValueError("No audio_url returned from upload")
 
-                elif status == "error":
-                    error_msg = result_data.get("error", "Unknown error")
-                    raise ValueError(f"Transcription failed: {error_msg}")
+    logger.info(f"Audio uploaded successfully: {audio_url}")
 
-                attempt += 1
+    # Step 2: Start transcription job
+    logger.info("Starting transcription job...")
+    transcription_payload = {
+        "audio_url": audio_url
+    }
+    transcription_headers = {
+        "x-gladia-key": settings.gladia_api_key,
+        "Content-Type": "application/json"
+    }
 
-            raise ValueError("Transcription timeout: exceeded maximum polling attempts")
+    transcription_response = await client.post(
+        settings.gladia_transcription_url,
+        json=transcription_payload,
+        headers=transcription_headers
+    )
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.exception("Erro inesperado na transcrição")
+    try:
+        transcription_response.raise_for_status()
+    except httpx.HTTPStatusError as exc:
+        detail = exc.response.text
+        logger.error(
+            "Gladia transcription API respondeu com %s: %s",
+            exc.response.status_code,
+            detail,
+        )
         raise HTTPException(
-            status_code=500,
-            detail=f"Transcription error: {str(e)}"
-        ) from e
+            status_code=exc.response.status_code,
+            detail=f"Gladia transcription error: {detail}"
+        ) from exc
+
+    transcription_result = transcription_response.json()
+    result_url = transcription_result.get("result_url")
+
+    if not result_url:
+        raise ValueError("No result_url returned from transcription job")
+
+    logger.info(f"Transcription job started, polling results from: {result_url}")
+
+    # Step 3: Poll for results
+    max_attempts = 60  # 60 attempts with 2 second intervals = 2 minutes max
+    attempt = 0
+
+    while attempt < max_attempts:
+        await asyncio.sleep(2)  # Wait 2 seconds between polls
+
+        result_response = await client.get(
+            result_url,
+            headers={"x-gladia-key": settings.gladia_api_key}
+        )
+
+        result_response.raise_for_status()
+        result_data = result_response.json()
+
+        status = result_data.get("status")
+        logger.info(f"Transcription status: {status}")
+
+        if status == "done":
+            # Extract transcription text
+            transcription_obj = result_data.get("result", {}).get("transcription")
+            if transcription_obj:
+                transcription = transcription_obj.get("full_transcript", "")
+                if transcription:
+                    logger.info("Transcription completed successfully")
+                    return transcription
+
+            if allow_empty:
+                # Segmento sem fala (ex.: só silêncio) não invalida o áudio inteiro
+                return ""
+
+            raise ValueError("Transcription completed but no text found")
+
+        elif status == "error":
+            error_msg = result_data.get("error", "Unknown error")
+            raise ValueError(f"Transcription failed: {error_msg}")
+
+        attempt += 1
+
+    raise ValueError("Transcription timeout: exceeded maximum polling attempts")
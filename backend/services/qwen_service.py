@@ -5,7 +5,12 @@ from config import get_settings
 settings = get_settings()
 
 
-async def get_llm_response(text: str, custom_context: str, db_context: str) -> str:
+async def get_llm_response(
+    text: str,
+    custom_context: str,
+    db_context: str,
+    client: Optional[httpx.AsyncClient] = None
+) -> str:
     """
     Gera resposta usando Qwen LLM via API OpenAI-compatible.
 
@@ -18,6 +23,8 @@ async def get_llm_response(text: str, custom_context: str, db_context: str) -> s
         text: Texto transcrito do áudio (input do usuário)
         custom_context: Contexto personalizado do usuário/KBF (PRIORITY 1)
         db_context: Contexto do RAG (base de conhecimento) (PRIORITY 2)
+        client: Client HTTP compartilhado (opcional), para reaproveitar conexões
+            entre várias chamadas; sem ele, uma conexão nova é aberta
 
     Returns:
         Resposta gerada pelo LLM como string
@@ -82,12 +89,19 @@ async def get_llm_response(text: str, custom_context: str, db_context: str) -> s
             "Content-Type": "application/json",
         }
 
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        if client is not None:
             response = await client.post(
                 f"{settings.qwen_api_url}/chat/completions",
                 json=payload,
                 headers=headers,
             )
+        else:
+            async with httpx.AsyncClient(timeout=60.0) as own_client:
+                response = await own_client.post(
+                    f"{settings.qwen_api_url}/chat/completions",
+                    json=payload,
+                    headers=headers,
+                )
 
         response.raise_for_status()
         result = response.json()
@@ -107,7 +121,8 @@ async def get_llm_response(text: str, custom_context: str, db_context: str) -> s
 async def generate_response(
     transcription: str,
     context_text: Optional[str] = None,
-    db_context: Optional[str] = None
+    db_context: Optional[str] = None,
+    client: Optional[httpx.AsyncClient] = None
 ) -> str:
     """
     Wrapper function para manter compatibilidade com código existente.
@@ -120,5 +135,6 @@ async def generate_response(
     return await get_llm_response(
         text=transcription,
         custom_context=custom_ctx,
-        db_context=db_ctx
+        db_context=db_ctx,
+        client=client
     )
@@ -2,6 +2,7 @@
 RAG Service - Retrieval Augmented Generation
 Busca contexto relevante no banco de dados com base na transcrição
 """
+import asyncio
 from typing import List
 from supabase import Client
 import logging
@@ -57,9 +58,12 @@ class RAGService:
                 return ""
 
             # Busca documentos que contenham as palavras-chave
-            result = self.supabase.table("knowledge_base").select("*").or_(
+            query = self.supabase.table("knowledge_base").select("*").or_(
                 ",".join([f"content.ilike.%{kw}%" for kw in keywords[:5]])  # Limita a 5 keywords
-            ).limit(top_k).execute()
+            ).limit(top_k)
+
+            # O client do Supabase é síncrono: executa em thread para não travar o event loop
+            result = await asyncio.to_thread(query.execute)
 
             if result.data and len(result.data) > 0:
                 contexts = [doc['content'] for doc in result.data]
@@ -20,7 +20,7 @@ BLUE='\033[0;34m'
 NC='\033[0m' # No Color
 
 # Check Python version
-echo -e "${BLUE}[1/6]${NC} Verificando Python..."
+echo -e "${BLUE}[1/7]${NC} Verificando Python..."
 if ! command -v python3 &> /dev/null; then
     echo -e "${RED}❌ Python 3 não encontrado. Por favor, instale Python 3.9+${NC}"
     exit 1
@@ -30,8 +30,18 @@ PYTHON_VERSION=$(python3 --version | cut -d' ' -f2)
 echo -e "${GREEN}✅ Python ${PYTHON_VERSION} encontrado${NC}"
 echo ""
 
+# Check ffmpeg (segmentação de áudios longos)
+echo -e "${BLUE}[2/7]${NC} Verificando ffmpeg..."
+if command -v ffmpeg &> /dev/null && command -v ffprobe &> /dev/null; then
+    echo -e "${GREEN}✅ ffmpeg encontrado${NC}"
+else
+    echo -e "${YELLOW}⚠️  ffmpeg não encontrado: áudios longos serão transcritos em um único job${NC}"
+    echo "   Instale com: sudo apt install ffmpeg (Debian/Ubuntu) ou brew install ffmpeg (macOS)"
+fi
+echo ""
+
 # Check if .env exists
-echo -e "${BLUE}[2/6]${NC} Verificando arquivo .env..."
+echo -e "${BLUE}[3/7]${NC} Verificando arquivo .env..."
 if [ ! -f .env ]; then
     echo -e "${YELLOW}⚠️  Arquivo .env não encontrado. Criando a partir de .env.example...${NC}"
     if [ -f .env.example ]; then
@@ -55,7 +65,7 @@ fi
 echo ""
 
 # Create virtual environment
-echo -e "${BLUE}[3/6]${NC} Configurando ambiente virtual Python..."
+echo -e "${BLUE}[4/7]${NC} Configurando ambiente virtual Python..."
 if [ -d "venv" ]; then
     echo -e "${YELLOW}⚠️  venv já existe. Removendo...${NC}"
     rm -rf venv
@@ -66,13 +76,13 @@ echo -e "${GREEN}✅ Ambiente virtual criado${NC}"
 echo ""
 
 # Activate virtual environment
-echo -e "${BLUE}[4/6]${NC} Ativando ambiente virtual..."
+echo -e "${BLUE}[5/7]${NC} Ativando ambiente virtual..."
 source venv/bin/activate
 echo -e "${GREEN}✅ Ambiente virtual ativado${NC}"
 echo ""
 
 # Install dependencies
-echo -e "${BLUE}[5/6]${NC} Instalando dependências Python..."
+echo -e "${BLUE}[6/7]${NC} Instalando dependências Python..."
 if [ ! -f requirements.txt ]; then
     echo -e "${RED}❌ requirements.txt não encontrado!${NC}"
     exit 1
@@ -85,7 +95,7 @@ echo -e "${GREEN}✅ Dependências instaladas com sucesso${NC}"
 echo ""
 
 # Check main file
-echo -e "${BLUE}[6/6]${NC} Verificando arquivo principal..."
+echo -e "${BLUE}[7/7]${NC} Verificando arquivo principal..."
 if [ ! -f main_complete.py ]; then
     echo -e "${RED}❌ main_complete.py não encontrado!${NC}"
     exit 1
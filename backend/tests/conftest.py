@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Os módulos do backend importam uns aos outros a partir de backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings exige credenciais; os testes não chamam serviços externos
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test.test.test")
+for name in (
+    "SUPABASE_JWT_SECRET",
+    "GLADIA_API_KEY",
+    "QWEN_API_KEY",
+):
+    os.environ.setdefault(name, "test")
@@ -0,0 +1,160 @@
+import asyncio
+
+import json
+
+import anyio
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+
+@pytest.fixture
+def batch_services(monkeypatch):
+    """
+    Substitui assinatura, RAG e LLM por fakes que registram as chamadas
+    """
+    calls = {
+        "subscription": 0,
+        "rag": [],
+        "clients": [],
+        "delays": {},
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+
+    async def fake_check_subscription(user_id):
+        calls["subscription"] += 1
+        return {"status": "premium"}
+
+    async def fake_get_rag_context(supabase_client, text):
+        calls["rag"].append(text)
+        return "contexto" if text.startswith("rag") else ""
+
+    async def fake_generate_response(transcription, context_text=None, db_context=None, client=None):
+        calls["clients"].append(client)
+        calls["in_flight"] += 1
+        calls["max_in_flight"] = max(calls["max_in_flight"], calls["in_flight"])
+        try:
+            if transcription == "boom":
+                raise RuntimeError("falha no LLM")
+            if transcription == "forever":
+                await asyncio.sleep(3600)
+            await asyncio.sleep(calls["delays"].get(transcription, 0.01))
+            return transcription.upper()
+        finally:
+            calls["in_flight"] -= 1
+
+    monkeypatch.setattr(main, "check_subscription", fake_check_subscription)
+    monkeypatch.setattr(main, "get_rag_context", fake_get_rag_context)
+    monkeypatch.setattr(main, "generate_response", fake_generate_response)
+    return calls
+
+
+@pytest.fixture
+def client():
+    main.app.dependency_overrides[main.verify_jwt] = lambda: {"user_id": "u1"}
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+def post_batch(client, messages):
+    response = client.post("/chat/batch", json={"messages": messages})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_subscription_is_checked_once_per_batch(batch_services, client):
+    post_batch(client, [{"message": f"pergunta {i}"} for i in range(5)])
+
+    assert batch_services["subscription"] == 1
+
+
+def test_identical_messages_share_one_rag_lookup(batch_services, client):
+    results = post_batch(client, [{"message": "rag igual"}, {"message": " rag igual "}, {"message": "outra"}])
+
+    assert sorted(batch_services["rag"]) == ["outra", "rag igual"]
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["context_used"] == "rag_context"
+    assert by_index[1]["context_used"] == "rag_context"
+    assert by_index[2]["context_used"] == "no_context"
+
+
+def test_messages_with_context_text_skip_rag(batch_services, client):
+    results = post_batch(client, [{"message": "rag pergunta", "context_text": "contexto do usuário"}])
+
+    assert batch_services["rag"] == []
+    assert results[0]["context_used"] == "user_context"
+
+
+def test_generation_respects_max_concurrency(batch_services, client, monkeypatch):
+    monkeypatch.setattr(main.settings, "chat_batch_max_concurrency", 2)
+
+    results = post_batch(client, [{"message": f"pergunta {i}"} for i in range(6)])
+
+    assert len(results) == 6
+    assert batch_services["max_in_flight"] == 2
+
+
+def test_results_stream_in_completion_order(batch_services, client):
+    batch_services["delays"].update({"lenta": 0.2, "media": 0.1, "rapida": 0.0})
+
+    results = post_batch(client, [{"message": "lenta"}, {"message": "media"}, {"message": "rapida"}])
+
+    assert [result["index"] for result in results] == [2, 1, 0]
+    assert [result["response"] for result in results] == ["RAPIDA", "MEDIA", "LENTA"]
+    assert all(result["user_id"] == "u1" for result in results)
+    assert all(result["subscription_status"] == "premium" for result in results)
+
+
+def test_item_failure_does_not_abort_batch(batch_services, client):
+    results = post_batch(client, [{"message": "boom"}, {"message": "ok"}, {"message": "  "}])
+
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["success"] is False
+    assert "falha no LLM" in by_index[0]["error"]
+    assert by_index[1]["success"] is True
+    assert by_index[1]["response"] == "OK"
+    assert by_index[2]["success"] is False
+
+
+def test_empty_batch_is_rejected(batch_services, client):
+    response = client.post("/chat/batch", json={"messages": []})
+
+    assert response.status_code == 400
+    assert batch_services["subscription"] == 0
+
+
+def test_batch_over_limit_is_rejected(batch_services, client, monkeypatch):
+    monkeypatch.setattr(main.settings, "chat_batch_max_messages", 3)
+
+    response = client.post("/chat/batch", json={"messages": [{"message": "x"}] * 4})
+
+    assert response.status_code == 400
+    assert batch_services["subscription"] == 0
+
+
+def test_stream_cancelled_midway_closes_qwen_client(batch_services):
+    payload = main.BatchChatRequest(messages=[{"message": "ok"}, {"message": "forever"}])
+    received = []
+
+    async def run():
+        response = await main.chat_batch(payload, user_data={"user_id": "u1"})
+
+        async def consume():
+            async for line in response.body_iterator:
+                received.append(line)
+
+        # Simula o Starlette cancelando o stream quando o cliente desconecta
+        async with anyio.create_task_group() as task_group:
+            task_group.start_soon(consume)
+            while not received:
+                await anyio.sleep(0.01)
+            task_group.cancel_scope.cancel()
+
+    anyio.run(run)
+
+    assert len(received) == 1
+    assert batch_services["clients"]
+    assert all(client.is_closed for client in batch_services["clients"])
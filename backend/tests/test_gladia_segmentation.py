@@ -0,0 +1,34 @@
+from services.gladia_service import _compute_cut_points
+
+TARGET_MS = 60000
+
+
+def test_forced_cuts_when_there_is_no_silence():
+    assert _compute_cut_points(300000, [], TARGET_MS) == [60000, 120000, 180000]
+
+
+def test_no_cuts_when_audio_fits_in_two_segments():
+    assert _compute_cut_points(120000, [], TARGET_MS) == []
+
+
+def test_cuts_at_middle_of_silence():
+    silences = [(50000, 51000), (70000, 71000), (200000, 201000)]
+
+    # O silêncio antes de target_ms é ignorado; os seguintes viram cortes
+    assert _compute_cut_points(300000, silences, TARGET_MS) == [70500, 130500, 200500]
+
+
+def test_forced_cut_before_a_distant_silence():
+    assert _compute_cut_points(300000, [(150000, 151000)], TARGET_MS) == [60000, 150500, 210500]
+
+
+def test_short_tail_is_merged_into_previous_segment():
+    silences = [(61000, 61600), (179500, 180000)]
+
+    assert _compute_cut_points(180000, silences, TARGET_MS) == [61300]
+
+
+def test_tail_of_half_target_is_kept_as_its_own_segment():
+    silences = [(61000, 61600), (149500, 150500)]
+
+    assert _compute_cut_points(180000, silences, TARGET_MS) == [61300, 150000]
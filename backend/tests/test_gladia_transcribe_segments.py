@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services import gladia_service
+
+
+class FakeUpload:
+    filename = "nota.m4a"
+    content_type = "audio/m4a"
+
+    async def read(self):
+        return b"audio"
+
+
+@pytest.fixture
+def segments(monkeypatch):
+    """
+    Força o modo de áudio longo e substitui a transcrição de cada segmento
+    por um fake controlado pelo teste
+    """
+    state = {
+        "count": 3,
+        "delays": {},
+        "texts": {},
+        "fail": None,
+        "allow_empty": [],
+        "cancelled": [],
+        "in_flight": 0,
+        "max_in_flight": 0,
+    }
+
+    def fake_split_long_audio(audio_content, filename):
+        return [str(i).encode() for i in range(state["count"])]
+
+    async def fake_transcribe_content(client, filename, audio_content, content_type, allow_empty=False):
+        index = int(audio_content)
+        state["allow_empty"].append(allow_empty)
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        try:
+            await asyncio.sleep(state["delays"].get(index, 0.05))
+            if index == state["fail"]:
+                raise HTTPException(status_code=502, detail="Gladia transcription error")
+            return state["texts"].get(index, f"s{index}")
+        except asyncio.CancelledError:
+            state["cancelled"].append(index)
+            raise
+        finally:
+            state["in_flight"] -= 1
+
+    monkeypatch.setattr(gladia_service, "_split_long_audio", fake_split_long_audio)
+    monkeypatch.setattr(gladia_service, "_transcribe_content", fake_transcribe_content)
+    monkeypatch.setattr(gladia_service.settings, "transcription_max_concurrency_per_user", 4)
+    return state
+
+
+def test_segments_run_concurrently(segments):
+    segments["count"] = 4
+    segments["delays"] = {i: 0.2 for i in range(4)}
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await gladia_service.transcribe_audio(FakeUpload(), user_id="u1")
+        return result, loop.time() - started
+
+    result, elapsed = asyncio.run(run())
+
+    assert result == "s0 s1 s2 s3"
+    assert segments["max_in_flight"] == 4
+    assert elapsed < 0.6
+
+
+def test_per_user_limit_is_shared_between_requests(segments, monkeypatch):
+    monkeypatch.setattr(gladia_service.settings, "transcription_max_concurrency_per_user", 2)
+
+    async def run():
+        await asyncio.gather(
+            gladia_service.transcribe_audio(FakeUpload(), user_id="u1"),
+            gladia_service.transcribe_audio(FakeUpload(), user_id="u1"),
+        )
+
+    asyncio.run(run())
+
+    assert segments["max_in_flight"] == 2
+
+
+def test_different_users_do_not_share_the_limit(segments, monkeypatch):
+    monkeypatch.setattr(gladia_service.settings, "transcription_max_concurrency_per_user", 2)
+
+    async def run():
+        await asyncio.gather(
+            gladia_service.transcribe_audio(FakeUpload(), user_id="u1"),
+            gladia_service.transcribe_audio(FakeUpload(), user_id="u2"),
+        )
+
+    asyncio.run(run())
+
+    assert segments["max_in_flight"] == 4
+
+
+def test_transcripts_keep_original_order(segments):
+    segments["delays"] = {0: 0.15, 1: 0.1, 2: 0.0}
+
+    result = asyncio.run(gladia_service.transcribe_audio(FakeUpload(), user_id="u1"))
+
+    assert result == "s0 s1 s2"
+
+
+def test_empty_segment_is_tolerated(segments):
+    segments["texts"] = {1: ""}
+
+    result = asyncio.run(gladia_service.transcribe_audio(FakeUpload(), user_id="u1"))
+
+    assert result == "s0 s2"
+    assert segments["allow_empty"] == [True, True, True]
+
+
+def test_failed_segment_cancels_the_others(segments):
+    segments["fail"] = 0
+    segments["delays"] = {0: 0.0, 1: 3600, 2: 3600}
+
+    async def run():
+        with pytest.raises(HTTPException) as exc_info:
+            await gladia_service.transcribe_audio(FakeUpload(), user_id="u1")
+        # Verifica ainda dentro do loop: asyncio.run cancelaria as sobras ao sair
+        return exc_info.value, list(segments["cancelled"]), segments["in_flight"]
+
+    error, cancelled, in_flight = asyncio.run(run())
+
+    assert error.status_code == 502
+    assert sorted(cancelled) == [1, 2]
+    assert in_flight == 0